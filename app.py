@@ -1,11 +1,19 @@
 import streamlit as st
 import os
 import time
+import random
+import queue
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from dotenv import load_dotenv
-from utils.downloader import download_audio_from_youtube
-from utils.transcriber import transcribe_audio
-from utils.summarizer import generate_blog
-import static_ffmpeg  # Import static_ffmpeg to ensure it's initialized
+from utils.downloader import extract_video_id, stream_audio_from_youtube
+from utils.transcriber import LANGUAGES, load_whisper_model, supported_compute_types, transcribe_stream
+from utils.summarizer import generate_blogs_async
+from st_copy_to_clipboard import st_copy_to_clipboard
+from utils.ffmpeg_init import ensure_ffmpeg
 
 # Load environment variables
 load_dotenv(override=True)
@@ -16,7 +24,7 @@ print(f"OPENAI_API_KEY present: {'OPENAI_API_KEY' in os.environ}")
 print(f"OPENAI_API_KEY starts with: {os.environ.get('OPENAI_API_KEY', '')[:5]}..." if 'OPENAI_API_KEY' in os.environ else "No OPENAI_API_KEY found")
 
 # Initialize static_ffmpeg
-static_ffmpeg.add_paths()
+ensure_ffmpeg()
 
 # Set page config
 st.set_page_config(
@@ -58,30 +66,32 @@ st.header("🎨 Card Making Ideas: Planning Agent")
 if 'card_ideas' not in st.session_state:
     st.session_state.card_ideas = []
     
+# Card making idea building blocks
+_THEMES = ("Birthday", "Thank You", "Wedding", "Anniversary", "Sympathy", "Graduation", "New Baby", "Holiday")
+_TECHNIQUES = ("Watercolor", "Embossing", "Die-cutting", "Stamping", "Quilling", "Pop-up", "Interactive")
+_STYLES = ("Vintage", "Modern", "Minimalist", "Whimsical", "Elegant", "Rustic", "Shabby Chic")
+_COLORS = ("warm", "cool", "pastel", "bold", "monochromatic")
+_TIPS = (
+    "Add some hand-lettered sentiments for a personal touch.",
+    "Incorporate some die-cut elements for dimension.",
+    "Use patterned paper to create interesting layers.",
+    "Add some bling with rhinestones or sequins.",
+    "Try a unique fold for added interest."
+)
+
 # Generate card ideas
-def generate_card_ideas():
-    # List of card making ideas
-    themes = ["Birthday", "Thank You", "Wedding", "Anniversary", "Sympathy", "Graduation", "New Baby", "Holiday"]
-    techniques = ["Watercolor", "Embossing", "Die-cutting", "Stamping", "Quilling", "Pop-up", "Interactive"]
-    styles = ["Vintage", "Modern", "Minimalist", "Whimsical", "Elegant", "Rustic", "Shabby Chic"]
-    
-    import random
-    ideas = []
-    for _ in range(5):  # Generate 5 ideas
-        theme = random.choice(themes)
-        technique = random.choice(techniques)
-        style = random.choice(styles)
-        idea = f"**{theme} Card**: Create a {style.lower()} card using {technique.lower()} technique. "
-        idea += f"Focus on {random.choice(['warm', 'cool', 'pastel', 'bold', 'monochromatic'])} colors. "
-        idea += random.choice([
-            "Add some hand-lettered sentiments for a personal touch.",
-            "Incorporate some die-cut elements for dimension.",
-            "Use patterned paper to create interesting layers.",
-            "Add some bling with rhinestones or sequins.",
-            "Try a unique fold for added interest."
-        ])
-        ideas.append(idea)
-    return ideas
+def generate_card_ideas(count=5):
+    # Draw every category for all ideas at once, then zip them into sentences
+    themes = random.choices(_THEMES, k=count)
+    techniques = random.choices(_TECHNIQUES, k=count)
+    styles = random.choices(_STYLES, k=count)
+    colors = random.choices(_COLORS, k=count)
+    tips = random.choices(_TIPS, k=count)
+    return [
+        f"**{theme} Card**: Create a {style.lower()} card using {technique.lower()} technique. "
+        f"Focus on {color} colors. {tip}"
+        for theme, technique, style, color, tip in zip(themes, techniques, styles, colors, tips)
+    ]
 
 # Generate ideas button
 if st.button("🎲 Generate Card Making Ideas"):
@@ -139,110 +149,280 @@ with st.sidebar:
         help="Larger models are more accurate but slower"
     )
     
+    # Quantization selection
+    compute_type = st.selectbox(
+        "Whisper Compute Type",
+        supported_compute_types(),
+        index=0,
+        help="Quantized int8 weights use less memory and run faster; auto picks int8_float16 on GPU and int8 on CPU"
+    )
+    
+    # Language hint
+    language = st.selectbox(
+        "Spoken Language",
+        LANGUAGES,
+        index=0,
+        help="Setting the video's language skips Whisper's language detection on every audio window"
+    )
+    
     # Additional options
     st.markdown("---")
     st.markdown("### About")
     st.markdown("""
     This app uses:
-    - [OpenAI Whisper](https://openai.com/research/whisper) for audio transcription
+    - [faster-whisper](https://github.com/SYSTRAN/faster-whisper) for batched audio transcription
     - [OpenAI GPT](https://openai.com) for blog post generation
     - [Streamlit](https://streamlit.io) for the web interface
-    - [pytube](https://pytube.io) for YouTube video downloading
-    - [moviepy](https://zulko.github.io/moviepy/) for audio extraction
+    - [yt-dlp](https://github.com/yt-dlp/yt-dlp) for YouTube audio downloading
+    - [FFmpeg](https://ffmpeg.org) for audio extraction
     """)
 
+# Keep the loaded Whisper pipeline alive across Streamlit reruns
+@st.cache_resource(show_spinner=False)
+def get_whisper_model(model_name, compute_type):
+    return load_whisper_model(model_name, compute_type=compute_type)
+
+# Thread pool whose workers share this script run's context, so Streamlit
+# elements and st.cache_data can be used from inside them
+def script_thread_pool(max_workers):
+    ctx = get_script_run_ctx()
+    return ThreadPoolExecutor(max_workers=max_workers, initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx))
+
+# Items the producer may run ahead of the consumer; with 30 s audio chunks this
+# is about two transcription windows (~60 MB of float32 samples)
+PREFETCH_MAX_ITEMS = 32
+
+# Run a producer (e.g. the audio download) on a worker thread so the caller can consume as it goes.
+# Setting `stop` ends the producer early, so a failed consumer does not wait for the full download
+def prefetch(iterator, executor, stop, max_items=PREFETCH_MAX_ITEMS):
+    items = queue.Queue(maxsize=max_items)
+    done = object()
+    
+    # Block while the queue is full, but give up once the consumer has stopped
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def produce():
+        try:
+            for item in iterator:
+                if not put(item):
+                    break
+        finally:
+            # Let the iterator release its resources (e.g. kill ffmpeg) when stopped early
+            if stop.is_set() and hasattr(iterator, "close"):
+                iterator.close()
+            put(done)
+    
+    # Submit eagerly so the download starts before the first item is requested
+    future = executor.submit(produce)
+    
+    def consume():
+        while (item := items.get()) is not done:
+            yield item
+        future.result()  # Re-raise any error from the producer
+    
+    return consume()
+
+# Reuse transcripts across runs for the same video and Whisper settings
+@st.cache_data(persist="disk", show_spinner=False, max_entries=100)
+def get_transcript(video_id, model_name, compute_type, language, _on_progress=None):
+    with script_thread_pool(max_workers=1) as executor:
+        stop = threading.Event()
+        chunks = prefetch(stream_audio_from_youtube(video_id, progress_callback=_on_progress), executor, stop)
+        try:
+            model = get_whisper_model(model_name, compute_type)
+            transcript = transcribe_stream(chunks, model_name, model=model, language=language)
+        finally:
+            # Cancel the download if transcription failed part way
+            stop.set()
+    if not transcript:
+        # Raising keeps empty results out of the cache
+        raise Exception("Transcription returned empty result")
+    return transcript
+
+# Raised when some posts in a batch failed; carries every result so the successes can still be shown
+class BlogBatchError(Exception):
+    def __init__(self, results):
+        super().__init__("Some blog posts could not be generated")
+        self.results = results
+
+# Generate all blog posts concurrently and reuse them for the same transcripts and tone;
+# the transcripts themselves are keyed by their hashes
+@st.cache_data(persist="disk", show_spinner=False, max_entries=100)
+def get_blog_posts(transcript_hashes, _transcripts, tone):
+    results = asyncio.run(generate_blogs_async(list(_transcripts), tone=tone))
+    if any(result.get('status') == 'error' for result in results):
+        # Raising keeps failed generations out of the cache
+        raise BlogBatchError(results)
+    return results
+
+# Long transcripts are paged so a rerun only sends one page to the browser
+TRANSCRIPT_PAGE_CHARS = 5000
+
+# Turning pages reruns just this fragment instead of the whole script
+@st.fragment
+def show_transcript(transcript, key="transcript"):
+    pages = -(-len(transcript) // TRANSCRIPT_PAGE_CHARS)
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Transcript page (1-{pages})", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page")
+    start = (page - 1) * TRANSCRIPT_PAGE_CHARS
+    st.text_area(
+        "Transcript",
+        value=transcript[start:start + TRANSCRIPT_PAGE_CHARS],
+        height=200,
+        disabled=True,
+        label_visibility="collapsed",
+        key=f"{key}_text_{page}"  # New widget per page so the value is not pinned
+    )
+    if pages > 1:
+        st.download_button(
+            label="Download full transcript",
+            data=transcript,
+            file_name=f"{key}.txt",
+            mime="text/plain",
+            key=f"{key}_download"
+        )
+
+# Videos downloaded and transcribed at the same time; the Whisper model itself
+# serves one request at a time, so extra workers overlap downloads with decoding
+MAX_PARALLEL_VIDEOS = 4
+
+# Transcribe several videos concurrently, keeping the input order
+def transcribe_videos(video_ids, model_name, compute_type, language):
+    # One download progress bar per video
+    bars = {video_id: st.progress(0.0, text=f"Downloading {video_id}...") for video_id in video_ids}
+    
+    def transcribe_one(video_id):
+        bar = bars[video_id]
+        try:
+            transcript = get_transcript(
+                video_id,
+                model_name,
+                compute_type,
+                language,
+                _on_progress=lambda fraction: bar.progress(fraction, text=f"Downloading {video_id}... {fraction:.0%}")
+            )
+            bar.progress(1.0, text=f"✅ {video_id}")
+            return transcript, None
+        except Exception as e:
+            bar.progress(1.0, text=f"❌ {video_id}")
+            return None, str(e)
+    
+    workers = min(MAX_PARALLEL_VIDEOS, len(video_ids))
+    with script_thread_pool(max_workers=workers) as executor:
+        return list(executor.map(transcribe_one, video_ids))
+
 # Main content area
 col1, col2 = st.columns([3, 1])
 
 # URL input
-url = st.text_input("YouTube Video URL or ID", "", placeholder="https://www.youtube.com/watch?v=...")
+urls_text = st.text_area(
+    "YouTube Video URLs or IDs",
+    "",
+    placeholder="https://www.youtube.com/watch?v=...",
+    help="One URL per line; several videos are processed together"
+)
+urls = [line.strip() for line in urls_text.splitlines() if line.strip()]
     
 # Process button
 process_clicked = st.button("Generate Blog Post")
 
 # Initialize session state
-if 'transcript' not in st.session_state:
-    st.session_state.transcript = ""
-if 'blog_post' not in st.session_state:
-    st.session_state.blog_post = ""
+if 'results' not in st.session_state:
+    st.session_state.results = []
 
 # Main processing logic
-if process_clicked and url:
+if process_clicked and urls:
     with st.spinner("Processing your request..."):
         try:
-            # Step 1: Download audio
-            with st.status("Downloading audio...", expanded=True) as status:
-                try:
-                    audio_path = download_audio_from_youtube(url)
-                    if not audio_path or not os.path.exists(audio_path):
-                        raise Exception("Failed to download audio file")
-                    status.update(label="✅ Audio downloaded", state="complete", expanded=False)
-                except Exception as e:
-                    status.update(label="❌ Error downloading audio", state="error")
-                    st.error(f"Error downloading audio: {str(e)}")
-                    st.stop()
+            # Process each video once, even if it was pasted in several URL forms
+            videos = {}
+            for url in urls:
+                videos.setdefault(extract_video_id(url), url)
+            video_ids = list(videos)
+            urls = list(videos.values())
+            results = []
             
-            # Step 2: Transcribe audio
-            with st.status("Transcribing audio...", expanded=True) as status:
-                try:
-                    st.session_state.transcript = transcribe_audio(audio_path, model_size)
-                    if not st.session_state.transcript:
-                        raise Exception("Transcription returned empty result")
-                    status.update(label="✅ Transcription complete", state="complete", expanded=False)
-                except Exception as e:
-                    status.update(label="❌ Error transcribing audio", state="error")
-                    st.error(f"Error transcribing audio: {str(e)}")
+            # Steps 1 & 2: Download and transcribe audio concurrently
+            with st.status(f"Downloading and transcribing {len(urls)} video(s)...", expanded=True) as status:
+                transcripts = transcribe_videos(video_ids, model_size, compute_type, language)
+                for url, video_id, (transcript, error) in zip(urls, video_ids, transcripts):
+                    if error:
+                        st.error(f"Error processing audio for {url}: {error}")
+                    else:
+                        results.append({"url": url, "video_id": video_id, "transcript": transcript})
+                if not results:
+                    status.update(label="❌ Error downloading or transcribing audio", state="error")
                     st.stop()
+                status.update(label=f"✅ {len(results)} video(s) downloaded and transcribed", state="complete", expanded=False)
             
-            # Step 3: Generate blog post
-            with st.status("Generating blog post...", expanded=True) as status:
+            # Step 3: Generate blog posts
+            with st.status("Generating blog posts...", expanded=True) as status:
+                transcripts = [result["transcript"] for result in results]
+                transcript_hashes = tuple(hashlib.sha256(transcript.encode("utf-8")).hexdigest() for transcript in transcripts)
                 try:
-                    result = generate_blog(st.session_state.transcript, tone=tone)
-                    if result.get('status') == 'error':
-                        raise Exception(result.get('message', 'Unknown error generating blog post'))
-                    
-                    st.session_state.blog_post = result.get('blog_post', '')
-                    if not st.session_state.blog_post:
-                        raise Exception("Blog post generation returned empty result")
-                        
-                    status.update(label="✅ Blog post generated", state="complete", expanded=False)
-                except Exception as e:
+                    blogs = get_blog_posts(transcript_hashes, transcripts, tone)
+                except BlogBatchError as e:
+                    blogs = e.results
+                
+                for result, blog in zip(results, blogs):
+                    result["blog_post"] = blog.get('blog_post', '')
+                    if blog.get('status') == 'error':
+                        st.error(f"Error generating blog post for {result['url']}: {blog.get('message', 'Unknown error generating blog post')}")
+                    elif not result["blog_post"]:
+                        st.error(f"Error generating blog post for {result['url']}: Blog post generation returned empty result")
+                
+                if not any(result["blog_post"] for result in results):
                     status.update(label="❌ Error generating blog post", state="error")
-                    st.error(f"Error generating blog post: {str(e)}")
-                    st.stop()
+                else:
+                    status.update(label="✅ Blog posts generated", state="complete", expanded=False)
+            
+            st.session_state.results = results
             
         except Exception as e:
             st.error(f"An unexpected error occurred: {str(e)}")
 
 # Display results
-if st.session_state.transcript:
+def show_result(result):
+    key = f"youtube_{result['video_id']}"
+    
     st.markdown("---")
     st.markdown("## 📝 Transcript")
-    st.text_area("", value=st.session_state.transcript, height=200, disabled=True)
-
-if st.session_state.blog_post:
-    # Add a divider
-    st.markdown("---")
-    
-    # Blog post header
-    st.markdown("## ✨ Generated Blog Post")
-    
-    # Blog post content
-    st.markdown(st.session_state.blog_post)
-    
-    # Download button
-    st.download_button(
-        label="Download as Markdown",
-        data=st.session_state.blog_post,
-        file_name="generated_blog_post.md",
-        mime="text/markdown"
-    )
-    
-    # Copy to clipboard button
-    if st.button("Copy to Clipboard"):
-        st.session_state.copied = True
-        st.experimental_rerun()
+    show_transcript(result["transcript"], key=f"{key}_transcript")
     
-    if st.session_state.get('copied', False):
-        st.success("Blog post copied to clipboard!")
-        st.session_state.copied = False
+    if result.get("blog_post"):
+        # Add a divider
+        st.markdown("---")
+        
+        # Blog post header
+        st.markdown("## ✨ Generated Blog Post")
+        
+        # Blog post content
+        st.markdown(result["blog_post"])
+        
+        # Download button
+        st.download_button(
+            label="Download as Markdown",
+            data=result["blog_post"],
+            file_name=f"{key}_blog_post.md",
+            mime="text/markdown",
+            key=f"{key}_blog_download"
+        )
+        
+        # Copy to clipboard in the browser, without a server rerun
+        st_copy_to_clipboard(result["blog_post"], "📋 Copy to Clipboard", "✅ Copied!", key=f"{key}_copy")
+
+if len(st.session_state.results) == 1:
+    show_result(st.session_state.results[0])
+elif st.session_state.results:
+    tabs = st.tabs([result["video_id"] for result in st.session_state.results])
+    for tab, result in zip(tabs, st.session_state.results):
+        with tab:
+            show_result(result)
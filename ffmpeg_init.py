@@ -0,0 +1,17 @@
+import static_ffmpeg
+
+# Set once static_ffmpeg has put its binaries on PATH for this process
+_INITIALIZED = False
+
+def ensure_ffmpeg():
+    """
+    Make the static ffmpeg/ffprobe binaries available on PATH, once per process.
+    
+    static_ffmpeg.add_paths() inspects PATH, unpacks the binaries on first use and
+    mutates os.environ, so repeated calls are skipped.
+    """
+    global _INITIALIZED
+    if _INITIALIZED:
+        return
+    static_ffmpeg.add_paths()
+    _INITIALIZED = True
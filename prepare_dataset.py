@@ -29,37 +29,54 @@ from __future__ import annotations
 import argparse
 import json
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List
+
+try:
+    import orjson  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
 
 BASE_DIR = Path(__file__).resolve().parent
 DEFAULT_DATASET = BASE_DIR / "dataset.jsonl"
 
 
-def load_rows(dataset_path: Path) -> List[Dict[str, Any]]:
-    rows: List[Dict[str, Any]] = []
+def iter_rows(dataset_path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield dataset rows one at a time without loading the whole file into memory."""
     if not dataset_path.exists():
-        return rows
-    with dataset_path.open("r", encoding="utf-8") as handle:
+        return
+    loads = orjson.loads if orjson is not None else json.loads
+    with dataset_path.open("rb") as handle:
         for line in handle:
             line = line.strip()
             if not line:
                 continue
-            rows.append(json.loads(line))
-    return rows
+            yield loads(line)
+
+
+def load_rows(dataset_path: Path) -> List[Dict[str, Any]]:
+    return list(iter_rows(dataset_path))
+
+
+def dump_row(row: Dict[str, Any]) -> str:
+    if orjson is not None:
+        # orjson always emits UTF-8, matching ensure_ascii=False below.
+        return orjson.dumps(row).decode("utf-8")
+    return json.dumps(row, ensure_ascii=False)
 
 
 def write_rows(dataset_path: Path, rows: List[Dict[str, Any]]) -> None:
     dataset_path.parent.mkdir(parents=True, exist_ok=True)
     with dataset_path.open("w", encoding="utf-8") as handle:
         for row in rows:
-            handle.write(json.dumps(row, ensure_ascii=False) + "\n")
+            handle.write(dump_row(row) + "\n")
 
 
 def add_sample(args: argparse.Namespace) -> None:
     dataset_path: Path = args.dataset
     rows = load_rows(dataset_path)
 
-    if any(row["id"] == args.id for row in rows):
+    existing_ids = {row["id"] for row in rows}
+    if args.id in existing_ids:
         raise SystemExit(f"Dataset already contains id '{args.id}'. Use a unique identifier.")
 
     transcript_path = Path(args.transcript)
@@ -90,23 +107,21 @@ def add_sample(args: argparse.Namespace) -> None:
 
 
 def list_samples(args: argparse.Namespace) -> None:
-    rows = load_rows(args.dataset)
-    if not rows:
-        print("Dataset is empty.")
-        return
-
-    for row in rows:
+    empty = True
+    for row in iter_rows(args.dataset):
+        empty = False
         print(f"- {row['id']}: {row['video_title']} ({row.get('tone','professional')})")
         print(f"  transcript -> {row['transcript_path']}")
         print(f"  reference  -> {row['reference_blog_path']}")
         if row.get("notes"):
             print(f"  notes      -> {row['notes']}")
+    if empty:
+        print("Dataset is empty.")
 
 
 def validate_dataset(args: argparse.Namespace) -> None:
-    rows = load_rows(args.dataset)
     missing = []
-    for row in rows:
+    for row in iter_rows(args.dataset):
         transcript_path = Path(row["transcript_path"])
         reference_path = Path(row["reference_blog_path"])
         if not transcript_path.exists():
@@ -3,35 +3,84 @@
 
 The script consumes a JSONL dataset that links transcripts, reference blogs,
 optional pre-generated outputs, and metadata such as tone. It can either call
-`utils.summarizer.generate_blog` (live mode) or load cached outputs (mock mode)
-and reports lexical and structural metrics for each sample plus aggregate stats.
+`utils.summarizer.generate_blog_async` concurrently with a shared `AsyncOpenAI`
+client (live mode) or load cached outputs (mock mode) and reports lexical and
+structural metrics for each sample plus aggregate stats.
 """
 from __future__ import annotations
 
 import argparse
+import asyncio
+import hashlib
 import json
+import mmap
 import os
+import re
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import UTC, datetime
+from functools import lru_cache
 from pathlib import Path
-from statistics import mean
-from typing import Dict, List
+from statistics import fmean
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
 
 try:
-    from rouge_score import rouge_scorer  # type: ignore
+    import numpy as np  # type: ignore
 except ModuleNotFoundError:  # pragma: no cover - optional dependency
-    rouge_scorer = None  # type: ignore
+    np = None  # type: ignore
 
 try:
-    from bert_score import score as bert_score  # type: ignore
+    from numba import njit  # type: ignore
 except ModuleNotFoundError:  # pragma: no cover - optional dependency
-    bert_score = None  # type: ignore
+    njit = None  # type: ignore
+
+try:
+    # rouge_score's Porter stemmer; nltk is installed with rouge-score.
+    from nltk.stem import porter  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover - optional dependency
+    porter = None  # type: ignore
+
+try:
+    from bert_score import BERTScorer  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover - optional dependency
+    BERTScorer = None  # type: ignore
+
+try:
+    import orjson  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
+
+try:
+    import diskcache  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover - optional dependency
+    diskcache = None  # type: ignore
+
+# Lazily initialized singletons, see get_rouge_tokenizer() and get_generate_blog_async().
+_ROUGE_TOKENIZERS: Dict[bool, "RougeTokenizer"] = {}
+_GENERATE_BLOG_ASYNC = None
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATASET_DEFAULT = BASE_DIR / "evals" / "dataset.jsonl"
 DEFAULT_OUTPUT_DIR = BASE_DIR / "evals" / "results"
 DEFAULT_GENERATED_DIR = BASE_DIR / "evals" / "mock_outputs"
-
-STOPWORDS = {
+REFERENCE_CACHE_DIR = BASE_DIR / "evals" / ".cache"
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+# Recorded in live-mode reports: transcripts over MAX_SECTION_TOKENS are summarized section by section
+# (map-reduce) rather than truncated, so scores are not comparable with reports made before that change.
+LIVE_GENERATOR = "utils.summarizer.generate_blog_async (map-reduce)"
+# Live-mode requests in flight at once; the OpenAI client retries 429/5xx with exponential backoff.
+DEFAULT_CONCURRENCY = 8
+LIVE_MAX_RETRIES = 5
+# Distilled default keeps eval iterations fast; --bert-fast also skips baseline rescaling for CI.
+DEFAULT_BERT_MODEL = "distilroberta-base"
+BERT_BATCH_SIZE = 64
+BERT_NTHREADS = 4
+# Per-sample metrics are computed at full precision and rounded only when written to the report.
+REPORT_PRECISION = 4
+# Files above this size are memory-mapped instead of read into a buffer.
+MMAP_THRESHOLD_BYTES = 256 * 1024
+
+STOPWORDS = frozenset({
     "a",
     "an",
     "and",
@@ -55,9 +104,20 @@ STOPWORDS = {
     "your",
     "this",
     "we",
-}
+})
+
+# Runs of letters/digits (Unicode-aware, like str.isalnum); underscores split tokens.
+TOKEN_RE = re.compile(r"[^\W_]+")
 
-CTA_KEYWORDS = {
+# rouge_score's tokens: lowercase runs of ASCII letters/digits, no stopword removal.
+ROUGE_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Part of the reference-token cache key, so changing either tokenizer invalidates cached tokens.
+TOKENIZER_FINGERPRINT = hashlib.sha1(
+    "\0".join([TOKEN_RE.pattern, ROUGE_TOKEN_RE.pattern, *sorted(STOPWORDS)]).encode("utf-8")
+).hexdigest()
+
+CTA_KEYWORDS = frozenset({
     "subscribe",
     "share",
     "tag",
@@ -67,117 +127,336 @@ CTA_KEYWORDS = {
     "let us know",
     "tell us",
     "comment",
-}
+})
+
+# Distinct tokens: a sorted uint64 array of token hashes with NumPy, otherwise a plain set.
+UniqueTokens = Any
+HASH_MASK = (1 << 63) - 1
+
+# One alternation scan instead of a substring search per keyword.
+CTA_RE = re.compile("|".join(re.escape(keyword) for keyword in sorted(CTA_KEYWORDS)))
+
+# Markdown headings: lines whose first non-blank character is "#".
+HEADING_RE = re.compile(r"(?m)^[ \t]*#")
 
 
 def read_jsonl(path: Path) -> List[Dict[str, str]]:
     """Load a JSONL dataset into memory."""
-    rows: List[Dict[str, str]] = []
-    with path.open("r", encoding="utf-8") as handle:
-        for line in handle:
-            line = line.strip()
-            if not line:
-                continue
-            rows.append(json.loads(line))
-    return rows
+    loads = orjson.loads if orjson is not None else json.loads
+    with path.open("rb") as handle:
+        return [loads(line) for line in handle if line.strip()]
+
+
+def dump_report(payload: Dict[str, object]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_INDENT_2)
+    return json.dumps(payload, indent=2).encode("utf-8")
+
+
+def dump_line(record: Dict[str, object]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(record).encode("utf-8") + b"\n"
 
 
 def read_text(path: Path) -> str:
     if not path.exists():
         raise FileNotFoundError(f"Expected file missing: {path}")
-    return path.read_text(encoding="utf-8").strip()
+    if path.stat().st_size <= MMAP_THRESHOLD_BYTES:
+        return path.read_text(encoding="utf-8").strip()
+    # Decode large transcripts straight from the page cache, without an intermediate bytes copy.
+    with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        text = str(mapped, "utf-8")
+    # Match the universal-newline translation that read_text applies to small files.
+    return text.replace("\r\n", "\n").replace("\r", "\n").strip()
 
 
 def tokenize(text: str) -> List[str]:
-    clean = "".join(ch.lower() if ch.isalnum() else " " for ch in text)
-    return [tok for tok in clean.split() if tok and tok not in STOPWORDS]
+    return [tok for tok in TOKEN_RE.findall(text.lower()) if tok not in STOPWORDS]
+
+
+def unique_tokens(tokens: List[str]) -> UniqueTokens:
+    """Deduplicate tokens, as 8-byte hashes in a contiguous array when NumPy is available."""
+    if np is None:
+        return set(tokens)
+    hashes = np.fromiter((hash(tok) & HASH_MASK for tok in tokens), dtype=np.uint64, count=len(tokens))
+    return np.unique(hashes)
+
+
+def _sorted_intersection_size(left, right) -> int:
+    """Count common values of two sorted, duplicate-free hash arrays with a two-pointer merge."""
+    i = j = count = 0
+    while i < left.size and j < right.size:
+        if left[i] == right[j]:
+            count += 1
+            i += 1
+            j += 1
+        elif left[i] < right[j]:
+            i += 1
+        else:
+            j += 1
+    return count
+
 
+if njit is not None:
+    # Compiled on first call and cached on disk; the merge needs no temporary arrays.
+    _sorted_intersection_size = njit(cache=True, nogil=True)(_sorted_intersection_size)
 
-def keyword_recall(reference: str, generated: str) -> float:
-    ref_tokens = set(tok for tok in tokenize(reference) if len(tok) > 4)
-    if not ref_tokens:
+
+def intersection_size(left: UniqueTokens, right: UniqueTokens) -> int:
+    if np is None:
+        return len(left & right)
+    if njit is not None:
+        return int(_sorted_intersection_size(left, right))
+    return int(np.intersect1d(left, right, assume_unique=True).size)
+
+
+def keyword_recall(ref_tokens: Iterable[str], gen_unique: UniqueTokens) -> float:
+    ref_keywords = unique_tokens([tok for tok in ref_tokens if len(tok) > 4])
+    if not len(ref_keywords):
         return 0.0
-    gen_tokens = set(tokenize(generated))
-    overlap = ref_tokens & gen_tokens
-    return round(len(overlap) / len(ref_tokens), 4)
+    return intersection_size(ref_keywords, gen_unique) / len(ref_keywords)
 
 
-def simple_overlap(reference: str, generated: str) -> float:
-    ref_tokens = set(tokenize(reference))
-    if not ref_tokens:
+def simple_overlap(ref_unique: UniqueTokens, gen_unique: UniqueTokens) -> float:
+    if not len(ref_unique):
         return 0.0
-    gen_tokens = set(tokenize(generated))
-    overlap = ref_tokens & gen_tokens
-    return round(len(overlap) / len(ref_tokens.union(gen_tokens)), 4)
+    overlap = intersection_size(ref_unique, gen_unique)
+    return overlap / (len(ref_unique) + len(gen_unique) - overlap)
 
 
 def detect_cta(text: str) -> bool:
-    lower = text.lower()
-    return any(keyword in lower for keyword in CTA_KEYWORDS)
+    return CTA_RE.search(text.lower()) is not None
 
 
 def heading_count(text: str) -> int:
-    return sum(1 for line in text.splitlines() if line.strip().startswith("#"))
+    return len(HEADING_RE.findall(text))
+
+
+class RougeTokenizer:
+    """Produces the same tokens as rouge_score's DefaultTokenizer, memoizing Porter stems per word."""
+
+    def __init__(self, use_stemmer: bool = True) -> None:
+        self._stem = lru_cache(maxsize=None)(porter.PorterStemmer().stem) if use_stemmer else None
+
+    def tokenize(self, text: str) -> List[str]:
+        tokens = ROUGE_TOKEN_RE.findall(text.lower())
+        if self._stem is None:
+            return tokens
+        # Like rouge_score, only words longer than 3 characters are stemmed.
+        return [self._stem(tok) if len(tok) > 3 else tok for tok in tokens]
+
+
+def get_rouge_tokenizer(use_stemmer: bool = True) -> RougeTokenizer:
+    """Build the ROUGE tokenizer (and its stem cache) once per stemming setting and reuse it for every sample."""
+    tokenizer = _ROUGE_TOKENIZERS.get(use_stemmer)
+    if tokenizer is None:
+        tokenizer = _ROUGE_TOKENIZERS[use_stemmer] = RougeTokenizer(use_stemmer)
+    return tokenizer
+
+
+def get_generate_blog_async():
+    """Import the live summarizer on first use; mock runs never need it (or the OpenAI SDK)."""
+    global _GENERATE_BLOG_ASYNC
+    if _GENERATE_BLOG_ASYNC is None:
+        from utils.summarizer import generate_blog_async
+
+        _GENERATE_BLOG_ASYNC = generate_blog_async
+    return _GENERATE_BLOG_ASYNC
+
+
+def open_reference_cache():
+    """Open the on-disk cache of reference-side tokens, or return None when diskcache is missing."""
+    if diskcache is None:
+        return None
+    return diskcache.Cache(str(REFERENCE_CACHE_DIR))
+
+
+def rouge_available(use_stemmer: bool = True) -> bool:
+    return porter is not None or not use_stemmer
 
 
-def rouge_scores(reference: str, generated: str) -> Dict[str, float]:
-    if rouge_scorer is None:
-        # Fall back to overlap proxy if the true scorer is unavailable.
-        overlap = simple_overlap(reference, generated)
+def reference_tokens(
+    path: Path, reference: str, use_stemmer: bool = True, cache=None
+) -> Tuple[List[str], List[str] | None]:
+    """Tokenize a reference blog for the lexical and ROUGE metrics, reusing cached tokens while nothing changed.
+
+    Returns the harness tokens and the (possibly stemmed) ROUGE tokens, or None for the latter when ROUGE
+    falls back to the overlap proxy. Token hash arrays are not cached: str hashes differ between processes.
+    """
+
+    def build() -> Tuple[List[str], List[str] | None]:
+        rouge = get_rouge_tokenizer(use_stemmer).tokenize(reference) if rouge_available(use_stemmer) else None
+        return tokenize(reference), rouge
+
+    if cache is None:
+        return build()
+    stat = path.stat()
+    # Editing the file (mtime/size), the tokenizers or the stemming setting changes the key,
+    # so stale entries are never read.
+    key = (
+        "reference_tokens",
+        TOKENIZER_FINGERPRINT,
+        rouge_available(use_stemmer),
+        use_stemmer,
+        str(path),
+        stat.st_mtime_ns,
+        stat.st_size,
+    )
+    entry = cache.get(key)
+    if entry is None:
+        entry = build()
+        cache.set(key, entry)
+    return entry
+
+
+def rouge1_f(ref_tokens: List[str], gen_tokens: List[str]) -> float:
+    """ROUGE-1 F-measure from ROUGE-tokenized documents (clipped unigram overlap)."""
+    overlap = sum((Counter(ref_tokens) & Counter(gen_tokens)).values())
+    if not overlap:
+        return 0.0
+    precision = overlap / len(gen_tokens)
+    recall = overlap / len(ref_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def rougeL_f(ref_tokens: List[str], gen_tokens: List[str]) -> float:
+    """ROUGE-L F-measure from ROUGE-tokenized documents (longest common subsequence)."""
+    if not ref_tokens or not gen_tokens:
+        return 0.0
+    # Same LCS dynamic programme as rouge_score, keeping only the previous row.
+    previous = [0] * (len(gen_tokens) + 1)
+    for ref_tok in ref_tokens:
+        current = [0]
+        for j, gen_tok in enumerate(gen_tokens, 1):
+            current.append(previous[j - 1] + 1 if ref_tok == gen_tok else max(previous[j], current[j - 1]))
+        previous = current
+    lcs = previous[-1]
+    if not lcs:
+        return 0.0
+    precision = lcs / len(gen_tokens)
+    recall = lcs / len(ref_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge_scores(
+    reference: str,
+    generated: str,
+    ref_unique: UniqueTokens,
+    gen_unique: UniqueTokens,
+    use_stemmer: bool = True,
+    ref_rouge: List[str] | None = None,
+) -> Dict[str, float]:
+    if not rouge_available(use_stemmer):
+        # Fall back to overlap proxy if the stemmer is unavailable.
+        overlap = simple_overlap(ref_unique, gen_unique)
         return {"rouge1_f": overlap, "rougeL_f": overlap}
 
-    scorer = rouge_scorer.RougeScorer(["rouge1", "rougeL"], use_stemmer=True)
-    scores = scorer.score(reference, generated)
-    return {"rouge1_f": round(scores["rouge1"].fmeasure, 4), "rougeL_f": round(scores["rougeL"].fmeasure, 4)}
+    # Tokenize each document once (the reference possibly from the cache) and compute
+    # both ROUGE variants from the same lists.
+    tokenizer = get_rouge_tokenizer(use_stemmer)
+    if ref_rouge is None:
+        ref_rouge = tokenizer.tokenize(reference)
+    gen_rouge = tokenizer.tokenize(generated)
+    return {"rouge1_f": rouge1_f(ref_rouge, gen_rouge), "rougeL_f": rougeL_f(ref_rouge, gen_rouge)}
 
 
-def collect_metrics(
+def collect_lexical_metrics(
     reference: str,
     generated: str,
-    skip_bert: bool = False,
-    bert_model: str | None = None,
+    ref_tokens: List[str] | None = None,
+    use_stemmer: bool = True,
+    ref_rouge: List[str] | None = None,
 ) -> Dict[str, float]:
+    # Tokenize each document once and share the tokens across metrics.
+    if ref_tokens is None:
+        ref_tokens = tokenize(reference)
+    gen_tokens = tokenize(generated)
+    ref_unique = unique_tokens(ref_tokens)
+    gen_unique = unique_tokens(gen_tokens)
+
     metrics: Dict[str, float] = {}
-    metrics.update(rouge_scores(reference, generated))
-    metrics["keyword_recall"] = keyword_recall(reference, generated)
+    metrics.update(rouge_scores(reference, generated, ref_unique, gen_unique, use_stemmer, ref_rouge=ref_rouge))
+    metrics["keyword_recall"] = keyword_recall(ref_tokens, gen_unique)
     metrics["call_to_action"] = float(detect_cta(generated))
     metrics["heading_count"] = float(heading_count(generated))
-    metrics["word_count_generated"] = float(len(tokenize(generated)))
-    metrics["word_count_reference"] = float(len(tokenize(reference)))
-    if not skip_bert and bert_score is not None:
-        try:
-            bert_kwargs: Dict[str, object] = {"lang": "en", "rescale_with_baseline": True}
-            if bert_model:
-                bert_kwargs["model_type"] = bert_model
-            precision, recall, f1 = bert_score([generated], [reference], **bert_kwargs)
-            metrics["bert_precision"] = round(float(precision.mean().item()), 4)
-            metrics["bert_recall"] = round(float(recall.mean().item()), 4)
-            metrics["bert_f1"] = round(float(f1.mean().item()), 4)
-        except Exception as exc:  # pragma: no cover - optional metric
-            metrics["bert_f1_error"] = 1.0
-            print(f"Warning: BERTScore failed ({exc}). Recorded bert_f1_error = 1.0")
+    metrics["word_count_generated"] = float(len(gen_tokens))
+    metrics["word_count_reference"] = float(len(ref_tokens))
     return metrics
 
 
+def compute_bert_scores(
+    references: List[str],
+    candidates: List[str],
+    bert_model: str | None = None,
+    skip_bert: bool = False,
+    batch_size: int = BERT_BATCH_SIZE,
+    rescale: bool = True,
+) -> List[Dict[str, float]]:
+    """Score all (candidate, reference) pairs with one batched BERTScore call, in input order."""
+    if skip_bert or BERTScorer is None or not candidates:
+        return [{} for _ in candidates]
+    try:
+        # IDF weights come from one pass over the distinct references. With a single
+        # reference every token would get zero weight, so plain averaging is used instead.
+        idf_sents = sorted(set(references))
+        use_idf = len(idf_sents) > 1
+        scorer = BERTScorer(
+            model_type=bert_model,
+            lang="en",
+            rescale_with_baseline=rescale,
+            idf=use_idf,
+            idf_sents=idf_sents if use_idf else None,
+            nthreads=BERT_NTHREADS,
+        )
+        # BERTScorer.score() takes its own batch_size and ignores the constructor's.
+        precision, recall, f1 = scorer.score(candidates, references, batch_size=batch_size)
+        return [
+            {
+                "bert_precision": p,
+                "bert_recall": r,
+                "bert_f1": f,
+            }
+            for p, r, f in zip(precision.tolist(), recall.tolist(), f1.tolist())
+        ]
+    except Exception as exc:  # pragma: no cover - optional metric
+        print(f"Warning: BERTScore failed ({exc}). Recorded bert_f1_error = 1.0")
+        return [{"bert_f1_error": 1.0} for _ in candidates]
+
+
 def ensure_output_dir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
-def resolve_generated_text(sample: Dict[str, str], mode: str, generated_dir: Path) -> str:
-    if mode == "live":
-        from utils.summarizer import generate_blog
+def blog_post_from_response(sample: Dict[str, str], response: object) -> str:
+    if isinstance(response, dict):
+        if response.get("status") != "success":
+            raise RuntimeError(f"Model call failed for {sample['id']}: {response.get('message')}")
+        return response["blog_post"]
+    raise TypeError("Unexpected response type from generate_blog_async")
+
+
+async def generate_live(samples: List[Dict[str, str]], concurrency: int = DEFAULT_CONCURRENCY) -> List[str]:
+    """Generate blog posts for all samples concurrently, with at most `concurrency` model calls in flight."""
+    from openai import AsyncOpenAI
+
+    generate_blog_async = get_generate_blog_async()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async with AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=LIVE_MAX_RETRIES) as client:
 
-        tone = sample.get("tone", "professional").lower()
-        response = generate_blog(sample["transcript"], tone=tone)
-        if isinstance(response, dict):
-            if response.get("status") != "success":
-                raise RuntimeError(f"Model call failed for {sample['id']}: {response.get('message')}")
-            return response["blog_post"]
-        # Backward compatibility with older summarizer returning a string.
-        if isinstance(response, str):
-            return response
-        raise TypeError("Unexpected response type from generate_blog")
+        async def generate_one(sample: Dict[str, str]) -> str:
+            # The semaphore guards each request, including the per-section calls for long transcripts.
+            response = await generate_blog_async(
+                sample["transcript"], tone=sample["tone"].lower(), client=client, limiter=semaphore
+            )
+            return blog_post_from_response(sample, response)
 
+        # gather keeps the dataset order in the report.
+        return await asyncio.gather(*(generate_one(sample) for sample in samples))
+
+
+def read_generated_text(sample: Dict[str, str], generated_dir: Path) -> str:
     # Mock / cached mode expects files named <id>.md or <id>.txt.
     for ext in (".md", ".txt"):
         candidate = generated_dir / f"{sample['id']}{ext}"
@@ -186,6 +465,29 @@ def resolve_generated_text(sample: Dict[str, str], mode: str, generated_dir: Pat
     raise FileNotFoundError(f"No cached output found for sample {sample['id']} in {generated_dir}")
 
 
+def load_sample(row: Dict[str, str]) -> Dict[str, str]:
+    """Read the transcript and reference blog of a single dataset row."""
+    reference_path = BASE_DIR / row["reference_blog_path"]
+    return {
+        "id": row["id"],
+        "transcript": read_text(BASE_DIR / row["transcript_path"]),
+        "reference": read_text(reference_path),
+        "reference_path": str(reference_path),
+        "tone": row.get("tone", "professional"),
+    }
+
+
+def score_sample(sample: Dict[str, str], generated: str, use_stemmer: bool = True, cache=None) -> Dict[str, object]:
+    """Lexically score one generated blog against its reference."""
+    ref_tokens, ref_rouge = reference_tokens(
+        Path(sample["reference_path"]), sample["reference"], use_stemmer=use_stemmer, cache=cache
+    )
+    metrics = collect_lexical_metrics(
+        sample["reference"], generated, ref_tokens=ref_tokens, use_stemmer=use_stemmer, ref_rouge=ref_rouge
+    )
+    return {"id": sample["id"], "reference": sample["reference"], "generated": generated, "metrics": metrics}
+
+
 def evaluate(
     dataset_path: Path,
     mode: str,
@@ -193,44 +495,71 @@ def evaluate(
     *,
     skip_bert: bool = False,
     bert_model: str | None = None,
-) -> Dict[str, Dict[str, float]]:
+    bert_rescale: bool = True,
+    use_stemmer: bool = True,
+    workers: int = DEFAULT_WORKERS,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> Tuple[List[str], Dict[str, List[float]]]:
+    """Score every dataset sample and return the sample ids plus one list of values per metric (in id order)."""
     dataset = read_jsonl(dataset_path)
-    results: Dict[str, Dict[str, float]] = {}
-
-    for row in dataset:
-        sample_id = row["id"]
-        transcript_path = BASE_DIR / row["transcript_path"]
-        reference_path = BASE_DIR / row["reference_blog_path"]
-
-        sample = {
-            "id": sample_id,
-            "transcript": read_text(transcript_path),
-            "reference": read_text(reference_path),
-            "tone": row.get("tone", "professional"),
-        }
-
-        generated = resolve_generated_text(sample, mode=mode, generated_dir=generated_dir)
-        metrics = collect_metrics(
-            sample["reference"],
-            generated,
-            skip_bert=skip_bert,
-            bert_model=bert_model,
-        )
-        results[sample_id] = metrics
 
-    return results
+    # Opened once up front and shared by the workers; diskcache.Cache is thread-safe.
+    cache = open_reference_cache()
+
+    # File reads are I/O bound, so samples are loaded and scored in parallel.
+    # executor.map keeps the dataset order in the report.
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            samples = list(executor.map(load_sample, dataset))
+            if mode == "live":
+                # Network-bound model calls overlap on one event loop instead of blocking a thread each.
+                generated = asyncio.run(generate_live(samples, concurrency=concurrency))
+            else:
+                generated = list(executor.map(lambda sample: read_generated_text(sample, generated_dir), samples))
+            processed = list(
+                executor.map(lambda sample, text: score_sample(sample, text, use_stemmer, cache=cache), samples, generated)
+            )
+    finally:
+        if cache is not None:
+            cache.close()
+
+    # BERTScore runs once over all samples rather than once per sample.
+    bert_metrics = compute_bert_scores(
+        [item["reference"] for item in processed],
+        [item["generated"] for item in processed],
+        bert_model=bert_model,
+        skip_bert=skip_bert,
+        rescale=bert_rescale,
+    )
 
+    # Every sample reports the same metrics, so each column lines up with `ids`.
+    ids = [item["id"] for item in processed]
+    columns: Dict[str, List[float]] = defaultdict(list)
+    for item, bert in zip(processed, bert_metrics):
+        for metric, value in item["metrics"].items():
+            columns[metric].append(value)
+        for metric, value in bert.items():
+            columns[metric].append(value)
+    return ids, dict(columns)
 
-def aggregate(results: Dict[str, Dict[str, float]]) -> Dict[str, float]:
-    if not results:
-        return {}
 
-    all_keys = sorted({metric for sample in results.values() for metric in sample.keys()})
-    summary: Dict[str, float] = {}
-    for metric in all_keys:
-        values = [sample[metric] for sample in results.values() if metric in sample]
-        summary[f"avg_{metric}"] = float(mean(values)) if values else 0.0
-    return summary
+def aggregate(columns: Dict[str, List[float]]) -> Dict[str, float]:
+    return {f"avg_{metric}": fmean(columns[metric]) for metric in sorted(columns) if columns[metric]}
+
+
+def iter_sample_records(ids: List[str], columns: Dict[str, List[float]]) -> Iterator[Dict[str, object]]:
+    """Yield one {"id": ..., <metric>: ...} record per sample, rebuilt from the metric columns."""
+    for index, sample_id in enumerate(ids):
+        record: Dict[str, object] = {"id": sample_id}
+        record.update((metric, round(values[index], REPORT_PRECISION)) for metric, values in columns.items())
+        yield record
+
+
+def write_samples(path: Path, ids: List[str], columns: Dict[str, List[float]]) -> None:
+    # One JSON line per sample, written as it is built, so the full report never sits in memory.
+    with path.open("wb") as handle:
+        for record in iter_sample_records(ids, columns):
+            handle.write(dump_line(record))
 
 
 def parse_args() -> argparse.Namespace:
@@ -240,7 +569,16 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--generated-dir", type=Path, default=DEFAULT_GENERATED_DIR, help="Directory containing cached/generated outputs")
     parser.add_argument("--output-dir", type=Path, default=DEFAULT_OUTPUT_DIR, help="Where to store the evaluation report")
     parser.add_argument("--skip-bert-score", action="store_true", help="Disable BERTScore metric collection (useful in offline environments)")
-    parser.add_argument("--bert-model", default="roberta-large", help="Model identifier used by BERTScore (ignored when --skip-bert-score is set)")
+    parser.add_argument(
+        "--bert-model",
+        default=DEFAULT_BERT_MODEL,
+        help="Model identifier used by BERTScore (ignored when --skip-bert-score is set). The distilled default is several "
+        "times faster; larger models such as roberta-large or microsoft/deberta-xlarge-mnli correlate better with human judgement",
+    )
+    parser.add_argument("--bert-fast", action="store_true", help=f"Use {DEFAULT_BERT_MODEL} without baseline rescaling (for CI runs)")
+    parser.add_argument("--no-stem", action="store_true", help="Disable Porter stemming in ROUGE-1/ROUGE-L (faster, slightly stricter matching)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Number of samples loaded and scored in parallel")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Maximum live-mode model calls in flight at once")
     return parser.parse_args()
 
 
@@ -248,27 +586,34 @@ def main() -> None:
     args = parse_args()
     ensure_output_dir(args.output_dir)
 
-    results = evaluate(
+    ids, columns = evaluate(
         args.dataset,
         mode=args.mode,
         generated_dir=args.generated_dir,
         skip_bert=args.skip_bert_score,
-        bert_model=None if args.skip_bert_score else args.bert_model,
+        bert_model=None if args.skip_bert_score else (DEFAULT_BERT_MODEL if args.bert_fast else args.bert_model),
+        bert_rescale=not args.bert_fast,
+        use_stemmer=not args.no_stem,
+        workers=args.workers,
+        concurrency=args.concurrency,
     )
-    summary = aggregate(results)
+    summary = aggregate(columns)
 
     timestamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%SZ")
     report_path = args.output_dir / f"report_{timestamp}.json"
+    samples_path = report_path.with_suffix(".jsonl")
+    write_samples(samples_path, ids, columns)
     payload = {
         "dataset": str(args.dataset),
         "mode": args.mode,
         "generated_dir": str(args.generated_dir),
         "timestamp_utc": timestamp,
-        "samples": results,
+        **({"generator": LIVE_GENERATOR} if args.mode == "live" else {}),
+        "samples_path": samples_path.name,
         "summary": summary,
     }
-    report_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
-    print(f"Saved evaluation report to {report_path}")
+    report_path.write_bytes(dump_report(payload))
+    print(f"Saved evaluation report to {report_path} (per-sample metrics in {samples_path.name})")
 
 
 if __name__ == "__main__":
@@ -1,55 +1,49 @@
 import os
-from openai import OpenAI
-from typing import Dict, Optional
+import asyncio
+from contextlib import nullcontext
+from openai import AsyncOpenAI
+from typing import Dict, List, Optional
 import tiktoken
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv(override=True)
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Tone instructions appended to the prompt
+TONE_INSTRUCTIONS = {
+    "professional": "Write in a professional, business-appropriate tone.",
+    "casual": "Write in a casual, conversational tone.",
+    "educational": "Write in an informative, educational tone suitable for teaching.",
+    "persuasive": "Write in a persuasive, compelling tone that convinces the reader."
+}
 
-def count_tokens(text: str) -> int:
-    """
-    Count the number of tokens in a text string.
-    
-    Args:
-        text (str): The text to count tokens for
-        
-    Returns:
-        int: Number of tokens
-    """
-    encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
-    return len(encoding.encode(text))
+SYSTEM_PROMPT = "You are a professional content writer who creates engaging blog posts from video transcripts."
 
-def generate_blog(transcript: str, tone: str = "professional") -> Dict[str, str]:
+# Tokenizer of the chat model, looked up once per process
+_ENC = tiktoken.encoding_for_model("gpt-3.5-turbo")
+
+# Transcripts longer than this many tokens are summarized section by section first
+MAX_SECTION_TOKENS = 3000
+
+def normalize_tone(tone: str) -> str:
+    """Map a tone label (any case) onto a supported tone, defaulting to professional."""
+    tone = tone.lower()
+    return tone if tone in TONE_INSTRUCTIONS else "professional"
+
+def build_prompt(transcript: str, tone: str) -> str:
     """
-    Generate a blog post from a transcript using OpenAI's API.
+    Build the blog-writing prompt for a transcript.
     
     Args:
         transcript (str): The transcript text to summarize
-        tone (str): The tone of the blog post (professional, casual, educational, persuasive)
+        tone (str): A supported tone (see TONE_INSTRUCTIONS)
         
     Returns:
-        Dict[str, str]: Dictionary containing the generated blog post and metadata
+        str: The user prompt
     """
-    # Define tone instructions
-    tone_instructions = {
-        "professional": "Write in a professional, business-appropriate tone.",
-        "casual": "Write in a casual, conversational tone.",
-        "educational": "Write in an informative, educational tone suitable for teaching.",
-        "persuasive": "Write in a persuasive, compelling tone that convinces the reader."
-    }
-    
-    # Default to professional if invalid tone is provided
-    if tone not in tone_instructions:
-        tone = "professional"
-    
-    # Prepare the prompt
-    prompt = f"""
+    return f"""
     Please convert the following transcript from a YouTube video into a well-structured blog post.
-    {tone_instructions[tone]}
+    {TONE_INSTRUCTIONS[tone]}
     
     The blog post should include:
     1. An engaging introduction
@@ -61,35 +55,109 @@ def generate_blog(transcript: str, tone: str = "professional") -> Dict[str, str]
     Transcript:
     {transcript}
     """
+
+def generate_blog(transcript: str, tone: str = "professional") -> Dict[str, str]:
+    """
+    Generate a blog post from a transcript using OpenAI's API.
     
-    try:
-        # Calculate token count and handle long transcripts
-        token_count = count_tokens(prompt)
-        max_tokens = 4000  # Leave room for the response
+    Blocking wrapper around generate_blog_async, so long transcripts are
+    summarized section by section rather than truncated. Must not be called
+    from inside a running event loop; await generate_blog_async there instead.
+    
+    Args:
+        transcript (str): The transcript text to summarize
+        tone (str): The tone of the blog post (professional, casual, educational, persuasive)
         
-        if token_count > 3000:  # Approximate token limit for context
-            # Truncate the transcript if it's too long
-            encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
-            truncated_transcript = encoding.decode(encoding.encode(transcript)[:3000])
-            prompt = prompt.replace(transcript, truncated_transcript)
+    Returns:
+        Dict[str, str]: Dictionary containing the generated blog post and metadata
+    """
+    return asyncio.run(generate_blog_async(transcript, tone))
+
+async def _summarize_section(client: AsyncOpenAI, section: str, limiter: Optional[asyncio.Semaphore] = None) -> str:
+    """
+    Condense one section of a long transcript into detailed notes.
+    
+    Args:
+        client (AsyncOpenAI): Client used for the request
+        section (str): Part of the transcript
+        limiter (asyncio.Semaphore, optional): Held for the duration of the request
         
-        # Call OpenAI API
-        response = client.chat.completions.create(
+    Returns:
+        str: Notes covering the key points of the section
+    """
+    async with limiter or nullcontext():
+        response = await client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[
-                {"role": "system", "content": "You are a professional content writer who creates engaging blog posts from video transcripts."},
-                {"role": "user", "content": prompt}
+                {"role": "system", "content": "You summarize parts of video transcripts into detailed notes for a blog writer."},
+                {"role": "user", "content": f"Summarize the key points, steps and examples in this part of a video transcript as concise bullet points:\n\n{section}"}
             ],
-            max_tokens=2000,
-            temperature=0.7,
+            max_tokens=500,
+            temperature=0.3,
         )
+    return response.choices[0].message.content.strip()
+
+async def generate_blog_async(
+    transcript: str,
+    tone: str = "professional",
+    client: Optional[AsyncOpenAI] = None,
+    limiter: Optional[asyncio.Semaphore] = None,
+) -> Dict[str, str]:
+    """
+    Generate a blog post from a transcript using OpenAI's async API.
+    
+    Long transcripts are split into token windows that are summarized
+    concurrently, and the blog post is written from the combined notes.
+    
+    Args:
+        transcript (str): The transcript text to summarize
+        tone (str): The tone of the blog post (professional, casual, educational, persuasive)
+        client (AsyncOpenAI, optional): Client to reuse, e.g. across a batch
+        limiter (asyncio.Semaphore, optional): Acquired around every model call, so callers
+            can cap the requests in flight across sections and transcripts
+        
+    Returns:
+        Dict[str, str]: Dictionary containing the generated blog post and metadata
+    """
+    # Default to professional if invalid tone is provided
+    tone = normalize_tone(tone)
+    
+    owns_client = client is None
+    if owns_client:
+        client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    
+    try:
+        # Map: summarize sections of long transcripts in parallel
+        tokens = _ENC.encode(transcript)
+        if len(tokens) > MAX_SECTION_TOKENS:
+            sections = [
+                _ENC.decode(tokens[start:start + MAX_SECTION_TOKENS])
+                for start in range(0, len(tokens), MAX_SECTION_TOKENS)
+            ]
+            notes = await asyncio.gather(*(_summarize_section(client, section, limiter) for section in sections))
+            transcript = "\n\n".join(notes)
+            
+            # Keep the combined notes within the context budget as well
+            tokens = _ENC.encode(transcript)
+            if len(tokens) > MAX_SECTION_TOKENS:
+                transcript = _ENC.decode(tokens[:MAX_SECTION_TOKENS])
         
-        # Extract the generated blog post
-        blog_content = response.choices[0].message.content.strip()
+        # Reduce: write the blog post from the transcript or the combined notes
+        prompt = build_prompt(transcript, tone)
+        async with limiter or nullcontext():
+            response = await client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=2000,
+                temperature=0.7,
+            )
         
         return {
             "status": "success",
-            "blog_post": blog_content,
+            "blog_post": response.choices[0].message.content.strip(),
             "tokens_used": response.usage.total_tokens,
             "model": response.model,
             "tone": tone
@@ -100,3 +168,20 @@ def generate_blog(transcript: str, tone: str = "professional") -> Dict[str, str]
             "status": "error",
             "message": str(e)
         }
+    finally:
+        if owns_client:
+            await client.close()
+
+async def generate_blogs_async(transcripts: List[str], tone: str = "professional") -> List[Dict[str, str]]:
+    """
+    Generate blog posts for several transcripts concurrently.
+    
+    Args:
+        transcripts (List[str]): Transcript texts to summarize
+        tone (str): The tone of the blog posts
+        
+    Returns:
+        List[Dict[str, str]]: One result dictionary per transcript, in order
+    """
+    async with AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY")) as client:
+        return await asyncio.gather(*(generate_blog_async(transcript, tone, client=client) for transcript in transcripts))
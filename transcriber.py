@@ -1,86 +1,291 @@
-import whisper
 import os
 import ssl
+import threading
 import time
-import static_ffmpeg
-from typing import Optional
+import ctranslate2
+import numpy as np
+from typing import Iterable, List, Optional, Union
+from faster_whisper import WhisperModel, BatchedInferencePipeline
 
 # Disable SSL verification for the model download
 ssl._create_default_https_context = ssl._create_unverified_context
 
-def load_whisper_model(model_name: str = "base"):
+# Number of 30-second VAD chunks decoded together in one forward pass
+BATCH_SIZE = 16
+
+# Sample rate of in-memory audio expected by Whisper
+SAMPLE_RATE = 16000
+
+# Streamed audio is buffered into windows that fill one full batch
+WINDOW_SECONDS = 30 * BATCH_SIZE
+
+# Each window ends at the quietest 100 ms frame within its last few seconds, so
+# words are not split across two separately transcribed windows
+SPLIT_SEARCH_SECONDS = 5
+SPLIT_FRAME_SECONDS = 0.1
+
+# Greedy decoding, plus guards against error propagation and repetition loops on noisy audio
+DECODE_OPTIONS = {
+    "beam_size": 1,
+    "condition_on_previous_text": False,
+    "no_speech_threshold": 0.6,
+    "compression_ratio_threshold": 2.4,
+}
+
+# Longest phrase (in words) and number of back-to-back repeats kept by the loop filter
+MAX_REPEATED_NGRAM = 8
+MAX_NGRAM_REPEATS = 3
+
+# Directory holding checkpoints pre-converted with ct2-transformers-converter, e.g.
+# ct2-transformers-converter --model openai/whisper-base --quantization int8_float16 \
+#     --output_dir models/whisper-base-ct2
+MODELS_DIR = "./models"
+
+# CTranslate2 compute types the app may offer, in menu order; "auto" picks per device.
+# Only those the current device supports are shown (see supported_compute_types)
+COMPUTE_TYPES = ["auto", "int8_float16", "int8", "float16", "float32"]
+
+# Spoken-language hints selectable from the app; "auto" lets Whisper detect the
+# language, which costs an extra encoder pass at the start of every transcribed window
+LANGUAGES = ["auto", "en", "es", "fr", "de", "it", "pt", "hi"]
+
+# Loaded pipelines keyed by (model name, device, compute type), shared by every caller in the process
+_MODEL_CACHE = {}
+_MODEL_LOCK = threading.Lock()
+
+def default_device() -> str:
+    """Return "cuda" when a CUDA device is visible to CTranslate2, otherwise "cpu"."""
+    return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+
+def resolve_model_path(model_name: str) -> str:
     """
-    Load the Whisper model with proper initialization.
+    Prefer a locally converted CTranslate2 checkpoint over downloading one.
+    
+    Args:
+        model_name (str): Name of the Whisper model (e.g. "base")
+        
+    Returns:
+        str: Path to models/whisper-<name>-ct2 if it exists, otherwise the model name
+    """
+    local_path = os.path.join(MODELS_DIR, f"whisper-{model_name}-ct2")
+    return local_path if os.path.isdir(local_path) else model_name
+
+def default_compute_type(device: str) -> str:
+    """Return int8 weights with float16 activations on GPU and plain int8 on CPU."""
+    return "int8_float16" if device == "cuda" else "int8"
+
+def _load_with_retries(model_name: str, device: str, compute_type: str) -> BatchedInferencePipeline:
+    """Load a faster-whisper model from disk (or the hub), retrying with exponential backoff."""
+    # Create the models directory once, before the first load; audio is decoded
+    # in-process by PyAV, so transcription itself needs no ffmpeg binary
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    
+    print(f"Loading Whisper {model_name} model on {device} ({compute_type})...")
+    
+    # Load the model with retry logic
+    max_retries = 3
+    retry_delay = 2  # seconds
+    
+    for attempt in range(max_retries):
+        try:
+            model = WhisperModel(
+                resolve_model_path(model_name),
+                device=device,
+                compute_type=compute_type,
+                download_root=MODELS_DIR,
+            )
+            print("Whisper model loaded successfully")
+            return BatchedInferencePipeline(model=model)
+        except Exception as e:
+            if attempt == max_retries - 1:  # Last attempt
+                print(f"Failed to load Whisper model after {max_retries} attempts: {str(e)}")
+                raise
+            print(f"Attempt {attempt + 1} failed: {str(e)}. Retrying in {retry_delay} seconds...")
+            time.sleep(retry_delay)
+            retry_delay *= 2  # Exponential backoff
+
+def supported_compute_types(device: Optional[str] = None) -> List[str]:
+    """Return "auto" plus the COMPUTE_TYPES that CTranslate2 can run on the device."""
+    supported = ctranslate2.get_supported_compute_types(device or default_device())
+    return [compute_type for compute_type in COMPUTE_TYPES if compute_type == "auto" or compute_type in supported]
+
+def load_whisper_model(model_name: str = "base", device: Optional[str] = None, compute_type: Optional[str] = None):
+    """
+    Load a faster-whisper model wrapped in a batched inference pipeline.
+    
+    The pipeline is loaded once per (model, device, compute type) and cached
+    at module scope, so later calls return the same instance.
     
     Args:
         model_name (str): Name of the Whisper model to load (default: "base")
+        device (str, optional): Device to run inference on (default: CUDA when available)
+        compute_type (str, optional): CTranslate2 compute type (default: "int8_float16" on GPU, "int8" on CPU)
         
     Returns:
-        whisper.Whisper: Loaded Whisper model
+        BatchedInferencePipeline: Loaded batched Whisper pipeline
     """
     try:
-        # Initialize static_ffmpeg for audio processing
-        static_ffmpeg.add_paths()
-        
-        # Create models directory if it doesn't exist
-        os.makedirs("./models", exist_ok=True)
-        
-        print(f"Loading Whisper {model_name} model...")
+        device = device or default_device()
+        if not compute_type or compute_type == "auto":
+            compute_type = default_compute_type(device)
+        elif compute_type not in ctranslate2.get_supported_compute_types(device):
+            # CTranslate2 rejects unsupported types outright, so retrying would never succeed
+            fallback = default_compute_type(device)
+            print(f"Compute type {compute_type} is not supported on {device}, using {fallback}")
+            compute_type = fallback
         
-        # Load the model with retry logic
-        max_retries = 3
-        retry_delay = 2  # seconds
-        
-        for attempt in range(max_retries):
-            try:
-                model = whisper.load_model(model_name, download_root="./models")
-                print("Whisper model loaded successfully")
-                return model
-            except Exception as e:
-                if attempt == max_retries - 1:  # Last attempt
-                    print(f"Failed to load Whisper model after {max_retries} attempts: {str(e)}")
-                    raise
-                print(f"Attempt {attempt + 1} failed: {str(e)}. Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-                retry_delay *= 2  # Exponential backoff
+        key = (model_name, device, compute_type)
+        # The lock keeps concurrent first calls from loading the same weights twice
+        with _MODEL_LOCK:
+            if key not in _MODEL_CACHE:
+                _MODEL_CACHE[key] = _load_with_retries(model_name, device, compute_type)
+            return _MODEL_CACHE[key]
                 
     except Exception as e:
         print(f"Error loading Whisper model: {str(e)}")
         raise
 
-def transcribe_audio(audio_path: str, model_name: str = "base") -> Optional[str]:
+def remove_repeated_ngrams(text: str, max_n: int = MAX_REPEATED_NGRAM, max_repeats: int = MAX_NGRAM_REPEATS) -> str:
     """
-    Transcribe an audio file using Whisper.
+    Collapse Whisper's looping hallucinations, where one phrase repeats back to back.
     
     Args:
-        audio_path (str): Path to the audio file
+        text (str): Transcript text
+        max_n (int): Longest phrase, in words, to check for repeats
+        max_repeats (int): Number of consecutive copies of a phrase to keep
+        
+    Returns:
+        str: Text with any further consecutive copies removed
+    """
+    words = []
+    for word in text.split():
+        words.append(word)
+        for n in range(1, max_n + 1):
+            if len(words) < n * (max_repeats + 1):
+                break
+            tail = words[-n:]
+            # Drop the newest copy if it would exceed max_repeats in a row
+            if all(words[-(k + 1) * n:-k * n] == tail for k in range(1, max_repeats + 1)):
+                del words[-n:]
+                break
+    return " ".join(words)
+
+def _transcribe_batched(model: BatchedInferencePipeline, audio: Union[str, np.ndarray], language: Optional[str] = None) -> str:
+    """Run one batched faster-whisper pass and join the segment texts."""
+    # Silero VAD drops silence and splits speech into <=30s windows that are decoded as a batch.
+    # vad_parameters is left unset: the batched defaults already cut pauses of 160 ms or more
+    # and cap each speech region at the 30s chunk length, which a custom dict would drop
+    segments, _ = model.transcribe(
+        audio,
+        language=None if language == "auto" else language,
+        batch_size=BATCH_SIZE,
+        vad_filter=True,
+        **DECODE_OPTIONS,
+    )
+    return remove_repeated_ngrams("".join(segment.text for segment in segments))
+
+def transcribe_audio(audio: Union[str, np.ndarray], model_name: str = "base", model: Optional[BatchedInferencePipeline] = None, language: Optional[str] = None) -> Optional[str]:
+    """
+    Transcribe audio using batched faster-whisper inference.
+    
+    Args:
+        audio (str | np.ndarray): Path to an audio file, or 16 kHz mono float32 samples
         model_name (str): Name of the Whisper model to use (default: "base")
+        model (BatchedInferencePipeline, optional): Preloaded pipeline to reuse
+        language (str, optional): Language code such as "en"; detected per window when omitted or "auto"
         
     Returns:
         str: Transcribed text, or None if there was an error
     """
     try:
         # Verify the audio file exists
-        if not os.path.exists(audio_path):
-            print(f"Error: Audio file not found at {audio_path}")
+        is_file = isinstance(audio, str)
+        if is_file and not os.path.exists(audio):
+            print(f"Error: Audio file not found at {audio}")
             return None
             
-        # Load the Whisper model
-        model = load_whisper_model(model_name)
+        # Load the Whisper model unless the caller already holds one
+        if model is None:
+            model = load_whisper_model(model_name)
         
         # Transcribe the audio
-        print(f"Transcribing audio: {audio_path}")
-        result = model.transcribe(audio_path, fp16=False)  # Disable FP16 for better compatibility
+        print(f"Transcribing audio: {audio if is_file else f'{len(audio)} in-memory samples'}")
+        text = _transcribe_batched(model, audio, language)
         
         # Clean up the audio file after successful transcription
-        try:
-            os.remove(audio_path)
-            print(f"Removed audio file: {audio_path}")
-        except Exception as e:
-            print(f"Warning: Could not remove audio file: {str(e)}")
+        if is_file:
+            try:
+                os.remove(audio)
+                print(f"Removed audio file: {audio}")
+            except Exception as e:
+                print(f"Warning: Could not remove audio file: {str(e)}")
         
-        return result["text"]
+        return text
         
     except Exception as e:
         print(f"Error during transcription: {str(e)}")
         return None
+
+def find_split_point(audio: np.ndarray) -> int:
+    """
+    Pick where to end a streamed window: the middle of the lowest-energy frame near its end.
+    
+    Args:
+        audio (np.ndarray): Buffered 16 kHz mono float32 samples
+        
+    Returns:
+        int: Sample index to cut at; samples from there on start the next window
+    """
+    frame = int(SPLIT_FRAME_SECONDS * SAMPLE_RATE)
+    frames = min(len(audio), SPLIT_SEARCH_SECONDS * SAMPLE_RATE) // frame
+    if frames < 2:
+        return len(audio)
+    start = len(audio) - frames * frame
+    energy = np.square(audio[start:].reshape(frames, frame)).mean(axis=1)
+    return start + int(np.argmin(energy)) * frame + frame // 2
+
+def transcribe_stream(chunks: Iterable[np.ndarray], model_name: str = "base", model: Optional[BatchedInferencePipeline] = None, language: Optional[str] = None) -> str:
+    """
+    Transcribe audio that is still arriving, one batch-sized window at a time.
+    
+    Chunks are buffered until they cover WINDOW_SECONDS, so each window is
+    transcribed while the producer keeps downloading the next one. Windows are
+    cut at a quiet point (see find_split_point) and the remainder carries over
+    into the next window. Errors raised by the chunk iterator (e.g. a failed
+    download) propagate to the caller.
+    
+    Args:
+        chunks (Iterable[np.ndarray]): 16 kHz mono float32 audio chunks in order
+        model_name (str): Name of the Whisper model to use (default: "base")
+        model (BatchedInferencePipeline, optional): Preloaded pipeline to reuse
+        language (str, optional): Language code such as "en"; detected per window when omitted or "auto"
+        
+    Returns:
+        str: Transcribed text
+    """
+    # Load the Whisper model unless the caller already holds one
+    if model is None:
+        model = load_whisper_model(model_name)
+    
+    window_samples = WINDOW_SECONDS * SAMPLE_RATE
+    texts = []
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= window_samples:
+            audio = np.concatenate(buffer)
+            split = find_split_point(audio)
+            print(f"Transcribing {split / SAMPLE_RATE:.1f}s window")
+            texts.append(_transcribe_batched(model, audio[:split], language))
+            rest = audio[split:]
+            buffer = [rest] if len(rest) else []
+            buffered = len(rest)
+    
+    # Flush whatever is left once the stream ends
+    if buffer:
+        print(f"Transcribing final {buffered / SAMPLE_RATE:.1f}s window")
+        texts.append(_transcribe_batched(model, np.concatenate(buffer), language))
+    
+    return " ".join(text for text in texts if text)